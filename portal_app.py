@@ -6,8 +6,10 @@
 #
 # 1. Prepare requirements.txt
 #    Create a file named requirements.txt in the same directory containing:
-#      streamlit
-#      pandas
+#      streamlit>=1.37
+#      pandas>=2.0
+#      numpy
+#      pyarrow>=14
 #
 # 2. Push to GitHub
 #    - Initialize a git repo:    git init
@@ -36,28 +38,203 @@
 
 import streamlit as st
 import pandas as pd
-import io
+import numpy as np
+import csv
+import tempfile
+import hashlib
+from typing import BinaryIO, Iterable, Iterator
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from itertools import repeat
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from streamlit_sortables import sort_items
 
+# Joint coordinate columns end in one of these two-character suffixes
+XYZ_SUFFIXES = frozenset({"_X", "_Y", "_Z"})
+
 def process_df(df: pd.DataFrame) -> pd.DataFrame:
     """Strip decimals from any column ending in _X, _Y or _Z."""
-    for col in df.columns:
-        if col.endswith(("_X", "_Y", "_Z")):
-            df[col] = df[col].round().astype("Int64")
+    # Integer columns have no decimals to strip, so leave them untouched
+    cols = [c for c in df.columns if c[-2:] in XYZ_SUFFIXES and df[c].dtype.kind == "f"]
+    if not cols:
+        return df
+
+    # Round all joint columns as one 2-D block instead of column by column;
+    # Arrow-backed nulls come out as NaN so both dtype backends share this path
+    arr = np.round(df[cols].to_numpy(dtype="float64", na_value=np.nan))
+    mask = np.isnan(arr)
+    if not mask.any():
+        # No gaps: plain int64 avoids the nullable dtype's per-element mask
+        df[cols] = arr.astype(np.int64, copy=False)
+        return df
+
+    ints = np.where(mask, 0, arr).astype("int64")
+    for i, col in enumerate(cols):
+        df[col] = pd.arrays.IntegerArray(ints[:, i], mask[:, i])
     return df
 
+# Bounded so parsed uploads from every session cannot grow server memory forever
+@st.cache_data(show_spinner=False, max_entries=32, ttl="1h")
+def load_and_process(key: str, _data: memoryview, remove_confidence: bool) -> pd.DataFrame:
+    """Parse one uploaded CSV and apply the column clean-up.
+
+    Cached on the upload_key() of the file rather than on the buffer itself,
+    so reruns that only change the order reuse the already parsed frames.
+    """
+    # Arrow keeps repeated header names as-is; rename them the way
+    # pd.read_csv does (a, a.1, ...) so every column can be addressed
+    header = dedupe_names(read_header(_data))
+
+    # Optionally skip any *_Confidence columns so the parser never loads them
+    usecols = None
+    if remove_confidence:
+        usecols = [c for c in header if not c.endswith("_Confidence")]
+
+    # Declare joint coordinates as float64 up front rather than letting the
+    # reader infer them; float32 would change how values near .5 round
+    column_types = {c: pa.float64() for c in header if c[-2:] in XYZ_SUFFIXES}
+
+    # Arrow's multithreaded reader is much faster than the default C parser,
+    # and reading through a BufferReader parses the upload without copying it
+    read_options = None
+    if header:
+        read_options = pacsv.ReadOptions(column_names=header, skip_rows=1)
+    table = pacsv.read_csv(
+        pa.BufferReader(_data),
+        read_options=read_options,
+        convert_options=pacsv.ConvertOptions(
+            include_columns=usecols, column_types=column_types
+        ),
+    )
+    df = table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    # Strip decimals from X/Y/Z
+    return process_df(df)
+
+def upload_key(name: str, data: memoryview, remove_confidence: bool) -> str:
+    """Identify an upload by its name, content and the confidence toggle."""
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    return f"{name}:{digest}:{int(remove_confidence)}"
+
+def pipelined_map(ex: Executor, fn, *iterables, depth: int) -> Iterator:
+    """Like ``Executor.map``, but submit at most ``depth`` calls ahead.
+
+    Results are yielded in order while later inputs are still being
+    processed, so the consumer's work overlaps with the workers'. At most
+    ``depth`` finished results wait for the consumer at any time.
+    """
+    pending = deque()
+    for args in zip(*iterables):
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+        pending.append(ex.submit(fn, *args))
+    while pending:
+        yield pending.popleft().result()
+
+def find_newline(data: memoryview) -> int:
+    """Return the offset of the first newline in ``data``, or -1."""
+    # memoryview has no .find(), so search a copied prefix, widening it
+    # until a newline turns up; the header line is normally well under 4 KB
+    size = 4096
+    while True:
+        nl = bytes(data[:size]).find(b"\n")
+        if nl != -1 or size >= len(data):
+            return nl
+        size *= 4
+
+def read_header(data: memoryview) -> list[str]:
+    """Return the column names from the first line of a CSV file."""
+    nl = find_newline(data)
+    first_line = bytes(data[:nl] if nl != -1 else data)
+    first_line = first_line.decode("utf-8-sig").rstrip("\r")
+    return next(csv.reader([first_line]), [])
+
+def dedupe_names(names: list[str]) -> list[str]:
+    """Suffix repeated column names with .1, .2, ... like pd.read_csv."""
+    names = list(names)
+    counts = {}
+    for i, col in enumerate(names):
+        cur_count = counts.get(col, 0)
+        while cur_count > 0:
+            counts[col] = cur_count + 1
+            col = f"{col}.{cur_count}"
+            cur_count = counts.get(col, 0)
+        names[i] = col
+        counts[col] = cur_count + 1
+    return names
+
+def concat_raw(datas: list[memoryview], buf: BinaryIO) -> None:
+    """Concatenate CSV files byte-for-byte, keeping only the first header."""
+    for i, data in enumerate(datas):
+        nl = find_newline(data)
+        if i == 0:
+            buf.write(data)
+        else:
+            if nl == -1:
+                continue  # header only, nothing to append
+            buf.write(data[nl + 1:])
+        # Make sure the next file's rows start on a fresh line, ending this
+        # one the same way as its header line (CRLF or LF)
+        if len(data) and data[-1] != ord("\n"):
+            buf.write(b"\r\n" if nl > 0 and data[nl - 1] == ord("\r") else b"\n")
+
+def merge_frames(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    """Align frames with differing columns into one DataFrame."""
+    combined = pd.concat(dfs, ignore_index=True, sort=False)
+    # A gap-free joint column is plain int64, and filling it for files that
+    # lack the column turns it into float64; cast back so no decimals return
+    cols = [
+        c for c in combined.columns
+        if c[-2:] in XYZ_SUFFIXES and combined[c].dtype.kind == "f"
+    ]
+    if cols:
+        combined[cols] = combined[cols].astype("Int64")
+    return combined
+
+def write_csv(df: pd.DataFrame, out: BinaryIO, header: bool) -> None:
+    """Append a frame to the output CSV."""
+    # DataFrame.to_csv rather than pyarrow.csv.write_csv: Arrow quotes every
+    # header and string and writes 1.0 as 1 and True as true, which would no
+    # longer match the verbatim raw-concat output or the original format
+    df.to_csv(out, index=False, header=header, encoding="utf-8")
+
+def write_parquet(frames: Iterable[pd.DataFrame], out: BinaryIO) -> None:
+    """Write frames as one zstd-compressed Parquet file.
+
+    Files can infer different types for the same column (int64 in one and
+    double in another, or null when a column is empty), so the tables are
+    combined with permissive promotion to a common schema before writing.
+    """
+    tables = [pa.Table.from_pandas(df, preserve_index=False) for df in frames]
+    table = pa.concat_tables(tables, promote_options="permissive")
+    pq.write_table(table, out, compression="zstd")
+
+@st.fragment
+def render_sortable() -> None:
+    """Drag-and-drop file ordering, rerun on its own when the list changes."""
+    # Persist the new order back into session state
+    st.session_state.file_set = sort_items(
+        items=st.session_state.file_set,
+        key="csv_joiner_sortable"   # unique key for this component
+    )
+
 # ─── Page setup ───────────────────────────────────────────────────────────────
 st.set_page_config(page_title="CSV Joiner Portal", layout="wide")
 st.title("📑 CSV Joiner Portal")
 st.write(
     "Upload multiple CSV files, drag-and-drop to reorder them, "
     "optionally drop confidence columns, strip decimals from X/Y/Z, "
-    "then download the combined CSV."
+    "then download the combined CSV or Parquet file."
 )
 
 # ─── Session State for file order ─────────────────────────────────────────────
 if "file_set" not in st.session_state:
     st.session_state.file_set = []
+if "file_set_key" not in st.session_state:
+    st.session_state.file_set_key = frozenset()
 
 # ─── File Uploader ─────────────────────────────────────────────────────────────
 uploaded_files = st.file_uploader(
@@ -71,17 +248,15 @@ if uploaded_files:
     names = [f.name for f in uploaded_files]
 
     # 2) If the set of files changed, reset our stored order
-    if set(st.session_state.file_set) != set(names):
+    names_key = frozenset(names)
+    if names_key != st.session_state.file_set_key:
         st.session_state.file_set = names.copy()
+        st.session_state.file_set_key = names_key
 
     # ─── Drag-and-Drop Reordering ───────────────────────────────────────────────
     st.subheader("🔀 Drag to Reorder Files")
-    ordered_names = sort_items(
-        items=st.session_state.file_set,
-        key="csv_joiner_sortable"   # unique key for this component
-    )
-    # Persist the new order back into session state
-    st.session_state.file_set = ordered_names
+    # A fragment, so dragging reruns only the sortable and not the whole page
+    render_sortable()
 
     # ─── Confidence–column toggle ───────────────────────────────────────────────
     remove_confidence = st.checkbox(
@@ -89,35 +264,82 @@ if uploaded_files:
         help="Tick to drop all columns ending in _Confidence before merging"
     )
 
+    # ─── Output format ─────────────────────────────────────────────────────────
+    output_format = st.radio(
+        "📄 Output format",
+        ["CSV", "Parquet"],
+        horizontal=True,
+        help="Parquet is much smaller and faster to produce; pick CSV for spreadsheet tools"
+    )
+    as_parquet = output_format == "Parquet"
+
     # ─── Process & Download ────────────────────────────────────────────────────
     if st.button("▶️ Process & Download"):
+        ordered_names = st.session_state.file_set
         file_map = {f.name: f for f in uploaded_files}
-        dfs = []
-        for fname in ordered_names:
-            df = pd.read_csv(file_map[fname])
-
-            # Optionally drop any *_Confidence columns
-            if remove_confidence:
-                conf_cols = [c for c in df.columns if c.endswith("_Confidence")]
-                df = df.drop(columns=conf_cols, errors="ignore")
-
-            # Strip decimals from X/Y/Z
-            df = process_df(df)
-            dfs.append(df)
-
-        # Concatenate and offer download
-        combined = pd.concat(dfs, ignore_index=True)
-        buf = io.StringIO()
-        combined.to_csv(buf, index=False)
-        buf.seek(0)
-
-        st.download_button(
-            label="📥 Download Combined CSV",
-            data=buf.getvalue(),
-            file_name="combined.csv",
-            mime="text/csv"
+        # Zero-copy views of the uploads, shared by hashing, parsing and concat
+        datas = [file_map[fname].getbuffer() for fname in ordered_names]
+
+        # Nothing to drop or round and identical headers: plain byte concat
+        headers = [read_header(data) for data in datas]
+        same_header = all(h == headers[0] for h in headers)
+        raw_concat = (
+            not as_parquet
+            and not remove_confidence
+            and same_header
+            and not any(c[-2:] in XYZ_SUFFIXES for c in headers[0])
         )
 
+        # Stream the output into a spooled file that moves to disk once it
+        # outgrows 64 MB. The download button still needs the full bytes,
+        # but this saves the intermediate in-memory copy built while writing.
+        with tempfile.SpooledTemporaryFile(max_size=64 << 20) as out:
+            if raw_concat:
+                concat_raw(datas, out)
+            else:
+                # Content-hash keys let re-uploads of identical files hit
+                # load_and_process's cache instead of being parsed again
+                keys = [
+                    upload_key(fname, data, remove_confidence)
+                    for fname, data in zip(ordered_names, datas)
+                ]
+
+                # Parse files in parallel; the CSV reader releases the GIL.
+                # Workers share this run's context so st.cache_data works there.
+                # The main thread writes file N while workers parse the next
+                # few. When streaming CSV, each frame is released once it has
+                # been written; Parquet and mixed-header merges still gather
+                # every file before writing.
+                workers = min(8, len(ordered_names))
+                with ThreadPoolExecutor(
+                    max_workers=workers,
+                    initializer=add_script_run_ctx,
+                    initargs=(None, get_script_run_ctx()),
+                ) as ex:
+                    frames = pipelined_map(
+                        ex, load_and_process, keys, datas, repeat(remove_confidence),
+                        depth=workers + 1
+                    )
+                    # Same columns everywhere: write each frame as it arrives
+                    # and never build the combined DataFrame. Differing
+                    # columns need pandas to align them first.
+                    if not same_header:
+                        frames = [merge_frames(list(frames))]
+
+                    if as_parquet:
+                        write_parquet(frames, out)
+                    else:
+                        for i, df in enumerate(frames):
+                            write_csv(df, out, header=(i == 0))
+            out.seek(0)
+
+            st.download_button(
+                label=f"📥 Download Combined {output_format}",
+                data=out.read(),
+                file_name="combined.parquet" if as_parquet else "combined.csv",
+                mime="application/octet-stream" if as_parquet else "text/csv"
+            )
+
 # ─── Sidebar Instructions ─────────────────────────────────────────────────────
 st.sidebar.header("ℹ️ Instructions")
 st.sidebar.markdown(
@@ -125,6 +347,7 @@ st.sidebar.markdown(
     1. Upload one or more CSV files.  
     2. Drag and drop the filenames to set your merge order.  
     3. (Optional) Tick **Remove confidence columns** to drop any *_Confidence fields.  
-    4. Click **Process & Download** to get the concatenated CSV.
+    4. Pick **CSV** or the smaller, faster **Parquet** as the output format.  
+    5. Click **Process & Download** to get the concatenated file.
     """
 )
\ No newline at end of file
@@ -0,0 +1,101 @@
+import io
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("streamlit_sortables")
+pq = pytest.importorskip("pyarrow.parquet")
+
+import portal_app
+
+
+def load(name: str, data: bytes):
+    return portal_app.load_and_process(f"test:{name}", memoryview(data), False)
+
+
+def test_write_parquet_promotes_mixed_types():
+    # Same header, but the confidence column is int64 in the first file and
+    # double in the second, and Note is empty (null type) in the first file
+    first = b"Hip_X,Hip_Confidence,Note\n1.2,1,\n2.6,1,\n"
+    second = b"Hip_X,Hip_Confidence,Note\n3.4,0.9,walk\n"
+    frames = [load("first", first), load("second", second)]
+
+    out = io.BytesIO()
+    portal_app.write_parquet(frames, out)
+    out.seek(0)
+    table = pq.read_table(out)
+
+    assert table.column("Hip_X").to_pylist() == [1, 3, 3]
+    assert table.column("Hip_Confidence").to_pylist() == [1.0, 1.0, 0.9]
+    assert table.column("Note").to_pylist() == [None, None, "walk"]
+
+
+def test_merge_frames_keeps_joint_columns_integer():
+    # Knee_X has no gaps in the first file (plain int64) and is missing
+    # from the second, so aligning the frames introduces NaN
+    frames = [load("both", b"Hip_X,Knee_X\n1.2,2.7\n"), load("hip", b"Hip_X\n3.4\n")]
+
+    combined = portal_app.merge_frames(frames)
+
+    assert str(combined["Knee_X"].dtype) == "Int64"
+    assert combined["Knee_X"].tolist() == [3, pd.NA]
+    assert combined["Hip_X"].tolist() == [1, 3]
+
+
+def test_concat_raw_pads_with_the_files_line_ending():
+    out = io.BytesIO()
+    portal_app.concat_raw(
+        [memoryview(b"a,b\r\n1,2"), memoryview(b"a,b\r\n3,4\r\n")], out
+    )
+    assert out.getvalue() == b"a,b\r\n1,2\r\n3,4\r\n"
+
+
+def test_mixed_header_csv_output():
+    frames = [load("both", b"Hip_X,Knee_X\n1.2,2.7\n"), load("hip", b"Hip_X\n3.4\n")]
+
+    out = io.BytesIO()
+    portal_app.write_csv(portal_app.merge_frames(frames), out, header=True)
+
+    assert out.getvalue() == b"Hip_X,Knee_X\n1,3\n3,\n"
+
+
+def test_process_df_rounds_without_gaps_to_int64():
+    df = pd.DataFrame({"Hip_X": [1.2, 2.5, -0.6], "Hip_Confidence": [0.5, 0.9, 1.0]})
+
+    df = portal_app.process_df(df)
+
+    assert df["Hip_X"].dtype == "int64"
+    assert df["Hip_X"].tolist() == [1, 2, -1]
+    assert df["Hip_Confidence"].tolist() == [0.5, 0.9, 1.0]
+
+
+def test_process_df_rounds_with_gaps_to_nullable_int():
+    df = pd.DataFrame({"Hip_Y": [1.6, None], "Knee_Z": [2.4, 3.5]})
+
+    df = portal_app.process_df(df)
+
+    assert str(df["Hip_Y"].dtype) == "Int64"
+    assert df["Hip_Y"].tolist() == [2, pd.NA]
+    assert df["Knee_Z"].tolist() == [2, 4]
+
+
+def test_concat_raw_skips_later_headers_and_header_only_files():
+    out = io.BytesIO()
+    portal_app.concat_raw(
+        [memoryview(b"a,b\n1,2"), memoryview(b"a,b"), memoryview(b"a,b\n3,4\n")], out
+    )
+    assert out.getvalue() == b"a,b\n1,2\n3,4\n"
+
+
+def test_read_header_strips_bom():
+    data = memoryview(b"\xef\xbb\xbfHip_X,\"Knee, left_X\"\r\n1,2\r\n")
+    assert portal_app.read_header(data) == ["Hip_X", "Knee, left_X"]
+
+
+def test_load_and_process_renames_repeated_headers():
+    df = load("dupes", b"Hip_X,Hip_X,a,a\n1.2,2.7,x,y\n")
+
+    assert df.columns.tolist() == ["Hip_X", "Hip_X.1", "a", "a.1"]
+    assert df["Hip_X"].tolist() == [1]
+    assert df["a.1"].tolist() == ["y"]